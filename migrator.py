@@ -1,13 +1,36 @@
 import base64
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-import datetime
+import io
 import json
 import logging
 import os
 import requests
+from requests.adapters import HTTPAdapter
+import tempfile
 import time
-from typing import Any, Callable, Dict, Iterable, Optional
+from typing import (
+    IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+)
 from urllib.parse import quote
+import urllib3
+from urllib3.exceptions import InsecureRequestWarning
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Use orjson for request and response bodies when it is installed
+if orjson is not None:
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+else:
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    _json_loads = json.loads
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,10 +42,41 @@ class SetFieldOperation:
     set_after_creation: bool
 
 
+class PartialMigrationError(RuntimeError):
+    # Raised when migrating an issue failed after its work item had been created, so
+    # that migrating it again would create a duplicate
+    def __init__(self, yt_id: str, work_item_id: int, cause: Exception):
+        super().__init__(
+            f"migration of {yt_id} failed after creating work item {work_item_id}: {cause}"
+        )
+        self.yt_id = yt_id
+        self.work_item_id = work_item_id
+
+
 CustomFieldHandler = Callable[[Dict[str, Any]], Iterable[SetFieldOperation]]
 
 
 class Migrator:
+    # Number of attachments transferred in parallel for a single issue
+    _ATTACHMENT_WORKERS = 4
+    # Attachments up to this size are held in memory, larger ones on disk
+    _ATTACHMENT_MEMORY_LIMIT = 8 * 1024 * 1024
+    # Number of issues fetched per request when listing a YouTrack project
+    _YT_PAGE_SIZE = 200
+    # Fields of a YouTrack issue needed for its migration
+    _YT_FIELDS = (
+        "customFields(name,value(avatarUrl,buildLink,color(id),fullName,id,"
+        "isResolved,localizedName,login,minutes,name,presentation,text)),"
+        "created,reporter(login),summary,description,"
+        "comments(created,author(login),text,attachments(url,name,id)),"
+        "attachments(url,name,id)"
+    )
+    # Request headers for the content types sent to ADO; authorization is set on the
+    # session itself
+    _HEADERS_JSON = {"Content-Type": "application/json"}
+    _HEADERS_JSON_PATCH = {"Content-Type": "application/json-patch+json"}
+    _HEADERS_OCTET_STREAM = {"Content-Type": "application/octet-stream"}
+
     def __init__(
         self,
         token_azo: str,
@@ -30,14 +84,88 @@ class Migrator:
         ado_organization: str,
         ado_project: str,
         token_youtrack: Optional[str] = None,
+        max_in_flight: int = 32,
+        verify_youtrack: Union[bool, str] = True,
+        cache_dir: Optional[str] = None,
     ):
         self.yt_base = yt_base
         self.ado_base = f"{ado_organization}/{ado_project}/_apis/wit"
+
+        # Optional on-disk cache of YouTrack issues and attachments, so that repeated
+        # runs only download what has changed. Issue and attachment IDs repeat across
+        # YouTrack instances, so each instance gets its own subdirectory
+        self._cache_dir = cache_dir and os.path.join(
+            os.path.expanduser(cache_dir), quote(yt_base, safe="")
+        )
+        if self._cache_dir:
+            for kind in ("issues", "attachments"):
+                os.makedirs(os.path.join(self._cache_dir, kind), exist_ok=True)
+
+        # URLs used for every issue; templates are filled in with str.format
+        self._yt_issue_tmpl = self.yt_base + "/api/issues/{}?fields=" + self._YT_FIELDS
+        self._yt_issue_link_tmpl = self.yt_base + "/issue/{}"
+        self._yt_project_issues_tmpl = (
+            self.yt_base + "/api/issues?fields=idReadable&$skip={}&$top={}&query={}"
+        )
+        self._ado_workitem_create_url = f"{self.ado_base}/workitems/$Task?api-version=6.0"
+        self._ado_workitem_update_tmpl = self.ado_base + "/workItems/{}?api-version=6.0"
+        self._ado_comments_tmpl = (
+            self.ado_base + "/workItems/{}/comments?api-version=6.0-preview.3"
+        )
+        self._ado_attachments_tmpl = self.ado_base + "/attachments?fileName={}&api-version=7.1"
         self.auth_header_ado = self._authorization_header_ado(token_azo)
         self.auth_header_youtrack = (
             token_youtrack and self._authorization_header_youtrack(token_youtrack)
         )
 
+        # Keep connections to YouTrack and Azure DevOps alive across requests, with at
+        # most max_in_flight requests to each of them at any time
+        self._yt_session = self._session(max_in_flight, retry_reads=True)
+        if self.auth_header_youtrack:
+            self._yt_session.headers["Authorization"] = self.auth_header_youtrack
+        # Either a bool or the path of a CA bundle for self-signed YouTrack certificates
+        self._yt_session.verify = verify_youtrack
+        if verify_youtrack is False:
+            urllib3.disable_warnings(InsecureRequestWarning)
+        # Requests to ADO are writes: a read error means ADO may already have applied
+        # them, so they are not sent again
+        self._ado_session = self._session(max_in_flight, retry_reads=False)
+        self._ado_session.headers["Authorization"] = self.auth_header_ado
+
+        # Issue data and custom fields fetched through issue_data and custom_fields,
+        # kept until the issue is migrated
+        self._yt_issue_cache: Dict[str, Dict] = {}
+        self._custom_fields_cache: Dict[str, Dict] = {}
+
+    @staticmethod
+    def _session(max_in_flight: int, retry_reads: bool) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=max_in_flight,
+            pool_block=True,
+            max_retries=Retry(
+                total=6,
+                read=None if retry_reads else 0,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=frozenset(["GET", "POST", "PATCH"]),
+            ),
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def close(self):
+        self._yt_session.close()
+        self._ado_session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     @staticmethod
     def _authorization_header_ado(pat: str) -> str:
         return "Basic " + base64.b64encode(f":{pat}".encode("ascii")).decode("ascii")
@@ -55,72 +183,163 @@ class Migrator:
             "value": yt_field,
         }
 
+    @staticmethod
+    def _ado_error(response: requests.Response) -> str:
+        # ADO identifies each request by its ActivityId, needed to trace it server-side
+        return (
+            f"HTTP {response.status_code} (ActivityId {response.headers.get('ActivityId')}): "
+            f"{response.text}"
+        )
+
     @staticmethod
     def _format_yt_timestamp(timestamp: int) -> str:
-        return datetime.datetime.utcfromtimestamp(timestamp // 1000).isoformat()
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(timestamp // 1000))
+
+    def _cache_path(self, kind: str, key: Optional[str]) -> Optional[str]:
+        if not self._cache_dir or not key:
+            return None
+        return os.path.join(self._cache_dir, kind, quote(key, safe=""))
+
+    @staticmethod
+    def _write_atomically(path: str, chunks: Iterable[bytes]):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
 
     def _youtrack_issue_data(self, yt_id: str):
-        yt_fields = (
-            "customFields(name,value(avatarUrl,buildLink,color(id),fullName,id,"
-            "isResolved,localizedName,login,minutes,name,presentation,text)),"
-            "created,reporter(login),summary,description,"
-            "comments(created,author(login),text,attachments(url,name,id)),"
-            "attachments(url,name,id)"
-        )
-        yt_url = f"{self.yt_base}/api/issues/{yt_id}?fields={yt_fields}"
+        yt_url = self._yt_issue_tmpl.format(yt_id)
+        cache_path = self._cache_path("issues", yt_id)
+        cached = None
         headers = {}
-        if self.auth_header_youtrack:
-            headers["Authorization"] = self.auth_header_youtrack
-        yt_data = requests.get(yt_url, verify=False, headers=headers).json()
+        if cache_path is not None and os.path.exists(cache_path):
+            with open(cache_path, "rb") as f:
+                cached = _json_loads(f.read())
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = self._yt_session.get(yt_url, headers=headers)
+        if cached is not None and response.status_code == 304:
+            return cached["data"]
+        yt_data = _json_loads(response.content)
+
+        # Only cache issues that YouTrack lets us revalidate
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if cache_path is not None and response.ok and (etag or last_modified):
+            entry = {"etag": etag, "last_modified": last_modified, "data": yt_data}
+            self._write_atomically(cache_path, [_json_dumps(entry)])
         return yt_data
 
     @staticmethod
     def _build_custom_field_dict(yt_data: Dict) -> Dict:
         return {v["name"]: v["value"] for v in yt_data["customFields"]}
 
+    def issue_data(self, yt_id: str) -> Dict:
+        yt_data = self._yt_issue_cache.get(yt_id)
+        if yt_data is None:
+            yt_data = self._yt_issue_cache[yt_id] = self._youtrack_issue_data(yt_id)
+        return yt_data
+
     def custom_fields(self, yt_id: str) -> Dict:
-        yt_data = self._youtrack_issue_data(yt_id)
-        return self._build_custom_field_dict(yt_data)
-
-    def _download_attachment(self, url: str, filename: str) -> bytes:
-        response = requests.get(url, verify=False)
-        logging.info(f"Downloading from URL: {url}")
-        logging.info(f"Response status code: {response.status_code}")
-        logging.info(f"Response content type: {response.headers.get('Content-Type')}")
-        logging.info(f"Response content length: {response.headers.get('Content-Length')}")
-        response.raise_for_status()
-        content = response.content
-        logging.info(f"First 100 bytes of content: {content[:100]}")
-        unique_filename = f"downloaded_{filename}"
-        with open(unique_filename, 'wb') as f:
-            f.write(content)
-        logging.info(f"Downloaded attachment saved to {unique_filename} with size {os.path.getsize(unique_filename)} bytes")
-        return content
-
-    def _upload_attachment(self, name: str, content: bytes) -> str:
-        res = requests.post(
-            f"{self.ado_base}/attachments?fileName={name}&api-version=7.1",
-            headers={
-                "Authorization": self.auth_header_ado,
-                "Content-Type": "application/octet-stream",
-            },
+        fields = self._custom_fields_cache.get(yt_id)
+        if fields is None:
+            yt_data = self.issue_data(yt_id)
+            fields = self._custom_fields_cache[yt_id] = self._build_custom_field_dict(yt_data)
+        return fields
+
+    def _download_attachment(self, url: str, cache_path: Optional[str] = None) -> IO[bytes]:
+        # Only send the YouTrack token to YouTrack itself; a None header drops the
+        # session default
+        on_youtrack = url.startswith(self.yt_base.rstrip("/") + "/")
+        headers = None if on_youtrack else {"Authorization": None}
+        with self._yt_session.get(url, headers=headers, stream=True) as response:
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug(
+                    "Downloading from URL: %s, status code: %s, content type: %s, "
+                    "content length: %s",
+                    url,
+                    response.status_code,
+                    response.headers.get("Content-Type"),
+                    response.headers.get("Content-Length"),
+                )
+            response.raise_for_status()
+            if cache_path is not None:
+                self._write_atomically(cache_path, response.iter_content(chunk_size=1 << 20))
+                return open(cache_path, "rb")
+            # Keep small attachments in memory; spool everything else to a temporary
+            # file so memory use does not grow with attachment size
+            length = int(response.headers.get("Content-Length") or 0)
+            if 0 < length <= self._ATTACHMENT_MEMORY_LIMIT:
+                return io.BytesIO(response.content)
+            content = tempfile.TemporaryFile()
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                content.write(chunk)
+            content.seek(0)
+            return content
+
+    def _upload_attachment(self, name: str, content: IO[bytes]) -> str:
+        response = self._ado_session.post(
+            self._ado_attachments_tmpl.format(quote(name, safe="")),
+            headers=self._HEADERS_OCTET_STREAM,
             data=content,
         )
-        return res.json()["url"]
+        if not response.ok:
+            raise RuntimeError(
+                f"upload of attachment {name} failed: {self._ado_error(response)}"
+            )
+        return _json_loads(response.content)["url"]
+
+    def _transfer_attachment(self, attachment: Dict, source: str) -> Optional[str]:
+        # Attachments are immutable on YouTrack, so a cached copy never goes stale
+        cache_path = self._cache_path("attachments", attachment.get("id"))
+        if cache_path is not None and os.path.exists(cache_path):
+            logging.debug("Using cached attachment %s from %s", attachment["name"], source)
+            attachment_content = open(cache_path, "rb")
+        else:
+            logging.debug("Downloading attachment %s from %s", attachment["name"], source)
+            attachment_url = attachment.get("url")
+            if not attachment_url:
+                logging.error(f"Attachment {attachment['name']} does not have a valid URL.")
+                return None
+            if not attachment_url.startswith("http"):
+                attachment_url = f"{self.yt_base}{attachment_url}"
+            attachment_content = self._download_attachment(attachment_url, cache_path)
+        with attachment_content:
+            logging.debug("Uploading attachment %s to Azure DevOps", attachment["name"])
+            return self._upload_attachment(attachment["name"], attachment_content)
 
     def migrate_issue(
-        self, yt_id: str, custom_field_handler: CustomFieldHandler,
+        self,
+        yt_id: str,
+        custom_field_handler: CustomFieldHandler,
+        yt_data: Optional[Dict] = None,
     ):
         create_ops = []  # Operations to perform on new Azure DevOps work item
-        yt_data = self._youtrack_issue_data(yt_id)
+        # Cached custom fields only describe the cached issue data, not data passed in
+        # explicitly, which the caller may have modified
+        cached_yt_data = self._yt_issue_cache.pop(yt_id, None)
+        cached_fields = self._custom_fields_cache.pop(yt_id, None)
+        if yt_data is None:
+            yt_data = cached_yt_data or self._youtrack_issue_data(yt_id)
+        else:
+            cached_fields = None
 
         # Handle general information about issue
         summary = yt_data["summary"]
         create_ops.append(self._set_field("System.Title", summary))
 
+        yt_link = self._yt_issue_link_tmpl.format(yt_id)
         created = self._format_yt_timestamp(yt_data["created"])
         description = (
-            f'[Migrated from <a href="{self.yt_base}/issue/{yt_id}">YouTrack</a>, '
+            f'[Migrated from <a href="{yt_link}">YouTrack</a>, '
             f'originally reported by {yt_data["reporter"]["login"]} on {created}]'
             f'\n\n{yt_data["description"]}'
         )
@@ -128,137 +347,187 @@ class Migrator:
         create_ops.append(self._set_field("System.Description", description))
 
         # Handle custom fields
-        fields = self._build_custom_field_dict(yt_data)
+        fields = cached_fields
+        if fields is None:
+            fields = self._build_custom_field_dict(yt_data)
         delayed_ops = []
         for custom_op in custom_field_handler(fields):
             op = self._set_field(custom_op.ado_field, custom_op.yt_field)
             (delayed_ops if custom_op.set_after_creation else create_ops).append(op)
 
-        # Create new work item in Azure DevOps boards and get its ID
-        res = requests.post(
-            f"{self.ado_base}/workitems/$Task?api-version=6.0",
-            headers={
-                "Authorization": self.auth_header_ado,
-                "Content-Type": "application/json-patch+json",
-            },
-            json=create_ops,
-        ).json()
-        if "id" not in res:
-            raise RuntimeError(f"migration of {yt_id} failed: {res}")
-        work_item_id = res["id"]
-
-        # Perform all operations that can only be performed after the work item has
-        # been created
-        requests.patch(
-            f"{self.ado_base}/workitems/{work_item_id}?api-version=6.0",
-            headers={
-                "Authorization": self.auth_header_ado,
-                "Content-Type": "application/json-patch+json",
-            },
-            json=delayed_ops,
-        )
+        # Start downloading attachments of comments and of the issue itself from
+        # YouTrack and uploading them to Azure DevOps right away, so that they transfer
+        # while the work item is being created
+        executor = ThreadPoolExecutor(max_workers=self._ATTACHMENT_WORKERS)
+        work_item_id = None
+        try:
+            comment_uploads = [
+                [
+                    (
+                        attachment["name"],
+                        executor.submit(
+                            self._transfer_attachment, attachment, f"comment in {yt_id}"
+                        ),
+                    )
+                    for attachment in comment.get("attachments", [])
+                ]
+                for comment in yt_data["comments"]
+            ]
+            issue_uploads = [
+                (
+                    attachment["name"],
+                    executor.submit(self._transfer_attachment, attachment, f"issue {yt_id}"),
+                )
+                for attachment in yt_data["attachments"]
+            ]
 
-        # Move all comments from YouTrack issue to the work item created above
-        for comment in yt_data["comments"]:
-            created = self._format_yt_timestamp(comment["created"])
-            author = comment["author"]["login"]
-            text = (
-                f'[Migrated from <a href="{self.yt_base}/issue/{yt_id}">YouTrack</a>. '
-                f"Original comment by {author} on {created}]"
-                f'\n\n{comment["text"]}'
+            # Create new work item in Azure DevOps boards and get its ID
+            response = self._ado_session.post(
+                self._ado_workitem_create_url,
+                headers=self._HEADERS_JSON_PATCH,
+                data=_json_dumps(create_ops),
             )
-            text = text.replace("\n", "<br/>\n")
-
-            # Handle attachments in comments
-            for attachment in comment.get("attachments", []):
-                logging.info(f"Downloading attachment {attachment['name']} from comment in {yt_id}")
-                attachment_url = attachment.get("url")
-                if not attachment_url:
-                    logging.error(f"Attachment {attachment['name']} does not have a valid URL.")
+            if not response.ok:
+                raise RuntimeError(f"migration of {yt_id} failed: {self._ado_error(response)}")
+            work_item_id = _json_loads(response.content)["id"]
+
+            # Perform all operations that can only be performed after the work item has
+            # been created
+            if delayed_ops:
+                self._ado_session.patch(
+                    self._ado_workitem_update_tmpl.format(work_item_id),
+                    headers=self._HEADERS_JSON_PATCH,
+                    data=_json_dumps(delayed_ops),
+                )
+
+            # Move all comments from YouTrack issue to the work item created above
+            for comment, uploads in zip(yt_data["comments"], comment_uploads):
+                created = self._format_yt_timestamp(comment["created"])
+                author = comment["author"]["login"]
+                text = (
+                    f'[Migrated from <a href="{yt_link}">YouTrack</a>. '
+                    f"Original comment by {author} on {created}]"
+                    f'\n\n{comment["text"]}'
+                )
+                text = text.replace("\n", "<br/>\n")
+
+                # Handle attachments in comments
+                for name, upload in uploads:
+                    uploaded_attachment_url = upload.result()
+                    if uploaded_attachment_url:
+                        text += f'<br/><a href="{uploaded_attachment_url}">{name}</a>'
+
+                self._ado_session.post(
+                    self._ado_comments_tmpl.format(work_item_id),
+                    headers=self._HEADERS_JSON,
+                    data=_json_dumps({"text": text}),
+                )
+
+            # Move all attachments as well, keeping track of the file name used on
+            # YouTrack
+            relations_ops = []
+            for name, upload in issue_uploads:
+                uploaded_attachment_url = upload.result()
+                if not uploaded_attachment_url:
                     continue
-                if not attachment_url.startswith("http"):
-                    attachment_url = f"{self.yt_base}{attachment_url}"
-                logging.info(f"Attachment URL: {attachment_url}")
-                attachment_content = self._download_attachment(attachment_url, attachment["name"])
-                logging.info(f"Uploading attachment {attachment['name']} to Azure DevOps")
-                uploaded_attachment_url = self._upload_attachment(attachment["name"], attachment_content)
-                text += f'<br/><a href="{uploaded_attachment_url}">{attachment["name"]}</a>'
-
-            requests.post(
-                f"{self.ado_base}/workItems/{work_item_id}"
-                "/comments?api-version=6.0-preview.3",
-                headers={
-                    "Authorization": self.auth_header_ado,
-                    "Content-Type": "application/json",
-                },
-                json={"text": text},
-            )
+                relations_ops.append(
+                    {
+                        "op": "add",
+                        "path": "/relations/-",
+                        "value": {
+                            "rel": "AttachedFile",
+                            "url": uploaded_attachment_url,
+                            "attributes": {"name": name},
+                        },
+                    }
+                )
 
-        # Move all attachments as well, keeping track of the file name used on YouTrack
-        for attachment in yt_data["attachments"]:
-            logging.info(f"Downloading attachment {attachment['name']} from issue {yt_id}")
-            attachment_url = attachment.get("url")
-            if not attachment_url:
-                logging.error(f"Attachment {attachment['name']} does not have a valid URL.")
-                continue
-            if not attachment_url.startswith("http"):
-                attachment_url = f"{self.yt_base}{attachment_url}"
-            logging.info(f"Attachment URL: {attachment_url}")
-            attachment_content = self._download_attachment(attachment_url, attachment["name"])
-            logging.info(f"Uploading attachment {attachment['name']} to Azure DevOps")
-            uploaded_attachment_url = self._upload_attachment(attachment["name"], attachment_content)
-            attachment_data = [
-                {
-                    "op": "add",
-                    "path": "/relations/-",
-                    "value": {
-                        "rel": "AttachedFile",
-                        "url": uploaded_attachment_url,
-                        "attributes": {"name": attachment["name"]},
-                    },
-                }
-            ]
-            requests.patch(
-                f"{self.ado_base}/workItems/{work_item_id}?api-version=6.0",
-                headers={
-                    "Authorization": self.auth_header_ado,
-                    "Content-Type": "application/json-patch+json",
-                },
-                json=attachment_data,
-            )
+            if relations_ops:
+                self._ado_session.patch(
+                    self._ado_workitem_update_tmpl.format(work_item_id),
+                    headers=self._HEADERS_JSON_PATCH,
+                    data=_json_dumps(relations_ops),
+                )
+        except Exception as e:
+            if work_item_id is None:
+                raise
+            raise PartialMigrationError(yt_id, work_item_id, e) from e
+        finally:
+            # Drop transfers still queued when the migration failed. Transfers already
+            # running are completed, so a failed create leaves their attachments
+            # uploaded to ADO without any work item referring to them
+            executor.shutdown(cancel_futures=True)
+
+    def _youtrack_project_issue_ids(
+        self, yt_project: str, issue_count_upper_limit: int
+    ) -> Iterator[str]:
+        # Sort by creation time so pages stay stable while issues are being updated, and
+        # skip any issue a shifted page still returns twice
+        query = quote(f"project:{yt_project} sort by: created asc")
+        seen = set()
+        for skip in range(0, issue_count_upper_limit, self._YT_PAGE_SIZE):
+            top = min(self._YT_PAGE_SIZE, issue_count_upper_limit - skip)
+            response = self._yt_session.get(self._yt_project_issues_tmpl.format(skip, top, query))
+            if response.status_code != 200:
+                raise RuntimeError(f"Failed to fetch issues: {response.text}")
+            issues = _json_loads(response.content)
+            for issue in issues:
+                yt_id = issue["idReadable"]
+                if yt_id not in seen:
+                    seen.add(yt_id)
+                    yield yt_id
+            if len(issues) < top:
+                break
 
     def migrate_project(
         self,
         yt_project: str,
         custom_field_handler: CustomFieldHandler,
         issue_count_upper_limit: int = 10000,
-    ):
-        headers = {}
-        if self.auth_header_youtrack:
-            headers["Authorization"] = self.auth_header_youtrack
-        yt_project_encoded = quote(yt_project)
-        response = requests.get(
-            f"{self.yt_base}/api/issues?fields=idReadable"
-            f"&$top={issue_count_upper_limit}"
-            f"&query=project:{yt_project_encoded}",
-            verify=False,
-            headers=headers,
-        )
-        print(response.text)  # Debugging line to print the response content
-        if response.status_code != 200:
-            raise RuntimeError(f"Failed to fetch issues: {response.text}")
-        issues = response.json()
-        for i, issue in enumerate(issues):
-            yt_id = issue["idReadable"]
-            logging.info(f"Migrating {yt_id}, {i + 1}/{len(issues)}")
-            while True:
+        max_workers: int = 8,
+    ) -> Tuple[List[str], Dict[str, int]]:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Start migrating each page of issues while the next one is fetched
+            pending = {}
+            try:
+                for yt_id in self._youtrack_project_issue_ids(
+                    yt_project, issue_count_upper_limit
+                ):
+                    pending[executor.submit(self.migrate_issue, yt_id, custom_field_handler)] = yt_id
+            except Exception:
+                for other in pending:
+                    other.cancel()
+                raise
+            issue_count = len(pending)
+            failed = []
+            partially_migrated = {}
+            for i, future in enumerate(as_completed(pending)):
+                yt_id = pending[future]
                 try:
-                    self.migrate_issue(yt_id, custom_field_handler)
-                    break
-                except json.decoder.JSONDecodeError:
-                    logging.info("Encountered an error. Wait 3 seconds")
-                    time.sleep(3)
-            logging.info(f"Migrated {yt_id}, {i + 1}/{len(issues)}")
+                    future.result()
+                except PartialMigrationError as e:
+                    logging.error(str(e))
+                    partially_migrated[yt_id] = e.work_item_id
+                    continue
+                except (requests.exceptions.RetryError, json.JSONDecodeError) as e:
+                    logging.error(f"Failed to migrate {yt_id}: {e}")
+                    failed.append(yt_id)
+                    continue
+                except Exception:
+                    for other in pending:
+                        other.cancel()
+                    raise
+                logging.info(f"Migrated {yt_id}, {i + 1}/{issue_count}")
+
+        if failed:
+            logging.error(f"Failed to migrate {len(failed)} issues: {', '.join(failed)}")
+        if partially_migrated:
+            logging.error(
+                f"Failed to complete {len(partially_migrated)} issues, whose work items "
+                "were created: "
+                + ", ".join(f"{k} ({v})" for k, v in partially_migrated.items())
+            )
+        return failed, partially_migrated
 
 
 # Define your variables
@@ -268,15 +537,6 @@ ado_organization = "https://dev.azure.com/UPDATE"
 ado_project = "boardtarget"
 token_youtrack = "perm:UPDATE"  # Ensure this is set correctly
 
-# Create an instance of the Migrator class
-migrator = Migrator(
-    token_azo=token_azo,
-    yt_base=yt_base,
-    ado_organization=ado_organization,
-    ado_project=ado_project,
-    token_youtrack=token_youtrack
-)
-
 # Define a custom field handler
 def custom_field_handler(fields):
     priority = fields.get("Priority", {}).get("name", "")
@@ -291,6 +551,14 @@ def custom_field_handler(fields):
     priority_value = priority_mapping.get(priority, 4)  # Default to Normal if not found
     yield SetFieldOperation("Microsoft.VSTS.Common.Priority", priority_value, False)
 
-# Migrate all issues from a YouTrack project
-yt_project = "migrate"
-migrator.migrate_project(yt_project, custom_field_handler, issue_count_upper_limit=50000)
\ No newline at end of file
+# Create an instance of the Migrator class, closing its connections when done
+with Migrator(
+    token_azo=token_azo,
+    yt_base=yt_base,
+    ado_organization=ado_organization,
+    ado_project=ado_project,
+    token_youtrack=token_youtrack
+) as migrator:
+    # Migrate all issues from a YouTrack project
+    yt_project = "migrate"
+    migrator.migrate_project(yt_project, custom_field_handler, issue_count_upper_limit=50000)
\ No newline at end of file